@@ -0,0 +1,96 @@
+import os
+import json
+import time
+
+from utils import script
+from utils.script import verify_script_input
+from utils.schnorr import verify_taproot_commitment
+from utils.sighash import TransactionHashes
+
+# Path to mempool folder containing transaction files
+MEMPOOL_FOLDER = "./mempool"
+
+SCRIPT_TYPES = ('p2sh', 'v0_p2wsh', 'v1_p2tr')
+BENCH_RUNS = 5
+
+
+def load_script_inputs():
+    """ Collect every p2sh, p2wsh and p2tr input from the mempool with its spending transaction """
+    inputs = []
+    for filename in os.listdir(MEMPOOL_FOLDER):
+        with open(os.path.join(MEMPOOL_FOLDER, filename), 'r') as file:
+            transaction = json.load(file)
+        tx_hashes = TransactionHashes(transaction)
+        for index, input in enumerate(transaction.get('vin', [])):
+            if input.get('prevout', {}).get('scriptpubkey_type') in SCRIPT_TYPES:
+                inputs.append((input, index, tx_hashes))
+    return inputs
+
+
+def cached_scripts(inputs):
+    """ The scripts, cache keys and size limits that verification hands to compile_script """
+    scripts = []
+    for input, _, _ in inputs:
+        scriptpubkey_type = input['prevout']['scriptpubkey_type']
+        witness = [bytes.fromhex(item) for item in input.get('witness', [])]
+        if scriptpubkey_type == 'v1_p2tr':
+            if len(witness) >= 2 and witness[-1][:1] == b'\x50':
+                witness = witness[:-1]
+            if len(witness) >= 2:
+                output_key = bytes.fromhex(input['prevout']['scriptpubkey'])[2:]
+                leaf_hash = verify_taproot_commitment(output_key, witness[-1], witness[-2])
+                scripts.append((witness[-2], leaf_hash, None))
+        elif 'inner_witnessscript_asm' in input:
+            scripts.append((witness[-1], script.sha256(witness[-1]), script.MAX_SCRIPT_SIZE))
+        elif scriptpubkey_type == 'p2sh' and not witness:
+            redeem_script = script.push_only_data(script.parse_script(bytes.fromhex(input['scriptsig'])))[-1]
+            scripts.append((redeem_script, script.sha256(redeem_script), script.MAX_SCRIPT_SIZE))
+    return scripts
+
+
+def time_compile(scripts):
+    start = time.perf_counter()
+    for script_bytes, script_hash, max_size in scripts:
+        script.compile_script(script_bytes, script_hash, max_size)
+    return time.perf_counter() - start
+
+
+def main():
+    inputs = load_script_inputs()
+    multisig = sum(1 for input, _, _ in inputs if 'OP_CHECKMULTISIG' in input.get('inner_witnessscript_asm', '')
+                   or 'OP_CHECKMULTISIG' in input.get('inner_redeemscript_asm', ''))
+    print(f"Script inputs: {len(inputs)} ({multisig} multisig)")
+    for scriptpubkey_type in SCRIPT_TYPES:
+        count = sum(1 for input, _, _ in inputs if input['prevout']['scriptpubkey_type'] == scriptpubkey_type)
+        print(f"  {scriptpubkey_type}: {count}")
+
+    # Parsing on its own, without and with the compiled script cache
+    scripts = cached_scripts(inputs)
+    distinct = len(set(script_hash for _, script_hash, _ in scripts))
+    print(f"Redeem/witness/tap scripts: {len(scripts)} ({distinct} distinct)")
+
+    # Best of several runs to keep timer noise out of the comparison
+    parse_times = []
+    cold_times = []
+    for _ in range(BENCH_RUNS):
+        start = time.perf_counter()
+        for script_bytes, _, _ in scripts:
+            script.parse_script(script_bytes)
+        parse_times.append(time.perf_counter() - start)
+        script._compiled_scripts.clear()
+        cold_times.append(time_compile(scripts))
+    warm_time = min(time_compile(scripts) for _ in range(BENCH_RUNS))
+
+    print(f"Parse, no cache: {min(parse_times) * 1000:.1f} ms")
+    print(f"Parse, cold cache: {min(cold_times) * 1000:.1f} ms")
+    print(f"Parse, warm cache: {warm_time * 1000:.1f} ms (limit {script.MAX_COMPILED_SCRIPTS} scripts)")
+
+    # Full verification, dominated by signature checks
+    start = time.perf_counter()
+    valid = sum(1 for input, index, tx_hashes in inputs if verify_script_input(input, index, tx_hashes))
+    print(f"Valid script inputs: {valid}/{len(inputs)}")
+    print(f"Verification: {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
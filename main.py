@@ -7,10 +7,13 @@ import time
 import sys
 
 from utils.header import calculate_block_header, calculate_block_hash
-from utils.coinbase import compute_witness_commitment, create_coinbase, satoshis_to_hex
+from utils.coinbase import compute_witness_commitment, create_coinbase, create_coinbase_without_witness, satoshis_to_hex
 from utils.weight import trim_transactions
 from utils.serialize import serialize_transaction, wit_serialize_transaction
 from utils.merkleroot import merkle_root
+from utils.script import verify_script_input
+from utils.sighash import TransactionHashes
+from utils.block import assemble_block, write_block
 
 
 
@@ -20,6 +23,13 @@ MEMPOOL_FOLDER = "./mempool"
 
 PUBLIC_KEYS_DIR = "./public_keys"
 
+# Script types accepted for both spent outputs (vin prevouts) and new outputs (vout)
+SCRIPTPUBKEY_TYPES = ['v1_p2tr', 'v0_p2wpkh', 'p2sh', 'p2pkh', 'p2wsh', 'v0_p2wsh']
+
+# Full raw block, written alongside output.txt (pass --hex for the hex form)
+RAW_BLOCK_FILE = "block.bin"
+RAW_BLOCK_HEX_FILE = "block.hex"
+
 
 
 
@@ -75,6 +85,7 @@ def validate_transaction(transaction):
         total_input_value = 0
         total_output_value = 0
         spent_outputs = set()  # Set to track spent outputs
+        tx_hashes = TransactionHashes(transaction)  # Shared by every input's signature checks
         
         transaction_size_bytes = sys.getsizeof(json.dumps(transaction))
 
@@ -83,7 +94,7 @@ def validate_transaction(transaction):
             return False
         
         # Validate each input (vin)
-        for input in vin:
+        for index, input in enumerate(vin):
             if input.get('hash') == '0' and input.get('N') == -1:
                 return False  # Reject coinbase transactions
             
@@ -102,7 +113,7 @@ def validate_transaction(transaction):
                 return False
             
             # Validate input based on scriptpubkey type
-            if scriptpubkey_type not in ['v1_p2tr', 'v0_p2wpkh', 'p2sh', 'p2pkh', 'p2wsh']:
+            if scriptpubkey_type not in SCRIPTPUBKEY_TYPES:
                 return False
             
             # Calculate total input value
@@ -124,8 +135,9 @@ def validate_transaction(transaction):
             # Validate output based on scriptpubkey type
             if scriptpubkey_type == 'v1_p2tr':
                 # Validation logic for v1_p2tr (Taproot) outputs
-                # Specific validation rules for Taproot outputs (v1_p2tr) can be added here
-                pass
+                # Key path signature or script path tapscript execution
+                if not verify_script_input(input, index, tx_hashes):
+                    return False
             
             elif scriptpubkey_type == 'v0_p2wpkh':
                 # Validation logic for v0_p2wpkh (SegWit) outputs
@@ -136,8 +148,9 @@ def validate_transaction(transaction):
             
             elif scriptpubkey_type == 'p2sh':
                 # Validation logic for p2sh (Pay to Script Hash) outputs
-                # Specific validation rules for P2SH outputs can be added here
-                pass
+                # Execute the redeem script (and witness script for nested segwit)
+                if not verify_script_input(input, index, tx_hashes):
+                    return False
             
             
             elif scriptpubkey_type == 'p2pkh':
@@ -147,12 +160,15 @@ def validate_transaction(transaction):
                 if input_value <= 0:
                     return False
             
-            elif scriptpubkey_type == 'p2wsh':
+            elif scriptpubkey_type in ('p2wsh', 'v0_p2wsh'):
                 # Validation logic for p2wsh (SegWit) outputs
                 if not scriptpubkey_address.startswith('bc1'):
                     return False
                 if input_value <= 0:
                     return False
+                # Execute the witness script against the witness stack
+                if not verify_script_input(input, index, tx_hashes):
+                    return False
                 
         # Validate each output (vout)
         for output in vout:
@@ -161,7 +177,7 @@ def validate_transaction(transaction):
             output_value = output.get('value', 0)
             
             # Validate output based on scriptpubkey type
-            if scriptpubkey_type not in ['v1_p2tr', 'v0_p2wpkh', 'p2sh', 'p2pkh', 'p2wsh']:
+            if scriptpubkey_type not in SCRIPTPUBKEY_TYPES:
                 return False
             
             # Calculate total output value
@@ -197,7 +213,7 @@ def validate_transaction(transaction):
                 if output_value <= 0:
                     return False
             
-            elif scriptpubkey_type == 'p2wsh':
+            elif scriptpubkey_type in ('p2wsh', 'v0_p2wsh'):
                 # Validation logic for p2wsh (SegWit) outputs
                 if not scriptpubkey_address.startswith('bc1'):
                     return False
@@ -290,7 +306,7 @@ def main():
         print(f"Number of valid transactions in block: {len(block_trxns)}")
 
         txids, rev_trxn_ids, ser_trxn, ser_tx_id = serialize_transaction(block_trxns)
-        rev_wtxids, ser_wit_trxn, wtxid, rev_wtxid = wit_serialize_transaction(block_trxns)
+        rev_wtxids, ser_wit_trxn, wtxid, rev_wtxid, wit_trxn_buffers = wit_serialize_transaction(block_trxns)
         print(f"{len(rev_wtxids)}")
         wit_hash = reverse_byte_order(merkle_root(rev_wtxids))
         print(f"{wit_hash}")
@@ -300,7 +316,9 @@ def main():
         coinbase_fees_hex = satoshis_to_hex(coinbase_fees)
         ser_coinbase_trxn = create_coinbase(wit_commitment, coinbase_fees_hex)
 
-        rev_ser_coinbase_trxn_id = hashlib.sha256(hashlib.sha256(bytes.fromhex(ser_coinbase_trxn)).digest()).digest()[::-1].hex()
+        # The txid hashes the coinbase without its marker, flag and witness
+        legacy_coinbase_trxn = create_coinbase_without_witness(wit_commitment, coinbase_fees_hex)
+        rev_ser_coinbase_trxn_id = hashlib.sha256(hashlib.sha256(bytes.fromhex(legacy_coinbase_trxn)).digest()).digest()[::-1].hex()
         rev_trxn_ids.insert(0, rev_ser_coinbase_trxn_id)
 
         
@@ -319,6 +337,13 @@ def main():
         print(f"Block Header: {block_header}")
         print(f"Block Hash: {block_hash}")
 
+        # Write the full block from the buffers kept during witness serialization
+        block_parts = assemble_block(block_header, ser_coinbase_trxn, wit_trxn_buffers)
+        if '--hex' in sys.argv[1:]:
+            write_block(RAW_BLOCK_HEX_FILE, block_parts, hex_mode=True)
+        else:
+            write_block(RAW_BLOCK_FILE, block_parts)
+
     except Exception as e:
         print(f"An error occurred: {str(e)}")
 
@@ -0,0 +1,58 @@
+import os
+
+from .serialize import varint_encode
+
+# Fallback when the system does not report its IOV_MAX
+DEFAULT_IOV_MAX = 1024
+
+
+def assemble_block(block_header, ser_coinbase_trxn, tx_buffers):
+    """ Collect the pieces of the raw block as memoryviews, without joining them """
+    parts = [
+        memoryview(bytes.fromhex(block_header)),
+        memoryview(varint_encode(len(tx_buffers) + 1)),  # Coinbase counts as a transaction
+        memoryview(bytes.fromhex(ser_coinbase_trxn)),
+    ]
+    parts.extend(memoryview(tx_data) for tx_data in tx_buffers)
+    return parts
+
+
+def writev_all(fd, parts):
+    # os.writev takes at most IOV_MAX buffers and may write only part of them
+    try:
+        iov_max = os.sysconf('SC_IOV_MAX')
+    except (AttributeError, ValueError, OSError):
+        iov_max = DEFAULT_IOV_MAX
+    if iov_max <= 0:
+        # -1 means the limit is indeterminate
+        iov_max = DEFAULT_IOV_MAX
+
+    index = 0
+    while index < len(parts):
+        batch = parts[index:index + iov_max]
+        written = os.writev(fd, batch)
+        if written == 0 and any(len(part) for part in batch):
+            raise OSError("os.writev wrote no bytes")
+        for part in batch:
+            if written < len(part):
+                # Resume from the unwritten tail of this buffer
+                parts[index] = part[written:]
+                break
+            written -= len(part)
+            index += 1
+
+
+def write_block(filename, parts, hex_mode=False):
+    """ Write the raw block to a file, either as bytes or as a single hex line """
+    if hex_mode:
+        with open(filename, 'w') as block_file:
+            block_file.writelines(part.hex() for part in parts)
+            block_file.write('\n')
+        return
+
+    with open(filename, 'wb') as block_file:
+        if hasattr(os, 'writev'):
+            block_file.flush()
+            writev_all(block_file.fileno(), list(parts))
+        else:
+            block_file.writelines(parts)
@@ -1,5 +1,11 @@
 import hashlib
 
+COINBASE_VERSION = "01000000"
+COINBASE_MARKER_FLAG = "0001"
+# Single witness item: the 32-byte witness reserved value
+COINBASE_WITNESS = "0120" + "00" * 32
+COINBASE_LOCKTIME = "00000000"
+
 def satoshis_to_hex(amount_satoshis):
     hex_amount = format(amount_satoshis, '016x')  # 16 characters for 64-bit (8 bytes) little-endian format
     hex_amount_le = ''.join(reversed([hex_amount[i:i+2] for i in range(0, len(hex_amount), 2)]))
@@ -91,5 +97,13 @@ def create_coinbase(wTXID_commit, coinbase_fees):
  
  return tx_data.hex(), wtxid_hash[::-1].hex()
      '''
-     serialize_coinbase = f"010000000001010000000000000000000000000000000000000000000000000000000000000000ffffffff2503233708184d696e656420627920416e74506f6f6c373946205b8160a4256c0000946e0100ffffffff02{coinbase_fees}1976a914edf10a7fac6b32e24daa5305c723f3de58db1bc888ac0000000000000000266a24aa21a9ed{wTXID_commit}0120000000000000000000000000000000000000000000000000000000000000000000000000"
-     return serialize_coinbase
\ No newline at end of file
+     serialize_coinbase = COINBASE_VERSION + COINBASE_MARKER_FLAG + coinbase_body(wTXID_commit, coinbase_fees) + COINBASE_WITNESS + COINBASE_LOCKTIME
+     return serialize_coinbase
+
+def create_coinbase_without_witness(wTXID_commit, coinbase_fees):
+    # Legacy serialization (no marker, flag or witness), which is what the txid hashes
+    return COINBASE_VERSION + coinbase_body(wTXID_commit, coinbase_fees) + COINBASE_LOCKTIME
+
+def coinbase_body(wTXID_commit, coinbase_fees):
+    # Input and outputs: block reward output and the witness commitment output
+    return f"010000000000000000000000000000000000000000000000000000000000000000ffffffff2503233708184d696e656420627920416e74506f6f6c373946205b8160a4256c0000946e0100ffffffff02{coinbase_fees}1976a914edf10a7fac6b32e24daa5305c723f3de58db1bc888ac0000000000000000266a24aa21a9ed{wTXID_commit}"
\ No newline at end of file
@@ -0,0 +1,73 @@
+from ecdsa import SECP256k1
+from ecdsa.ellipticcurve import INFINITY, PointJacobi
+
+from .serialize import varint_encode
+from .sighash import tagged_hash
+
+CURVE = SECP256k1.curve
+GENERATOR = SECP256k1.generator
+FIELD_SIZE = CURVE.p()
+CURVE_ORDER = SECP256k1.order
+
+
+def lift_x(x):
+    """ Point with the given x coordinate and an even y coordinate (BIP340) """
+    if x >= FIELD_SIZE:
+        return None
+    y_squared = (pow(x, 3, FIELD_SIZE) + 7) % FIELD_SIZE
+    y = pow(y_squared, (FIELD_SIZE + 1) // 4, FIELD_SIZE)
+    if pow(y, 2, FIELD_SIZE) != y_squared:
+        return None
+    if y & 1:
+        y = FIELD_SIZE - y
+    return PointJacobi(CURVE, x, y, 1, CURVE_ORDER)
+
+
+def schnorr_verify(pubkey, message, sig):
+    """ BIP340 verification of a 64-byte signature against a 32-byte x-only public key """
+    point = lift_x(int.from_bytes(pubkey, 'big'))
+    if point is None:
+        return False
+    r = int.from_bytes(sig[:32], 'big')
+    s = int.from_bytes(sig[32:64], 'big')
+    if r >= FIELD_SIZE or s >= CURVE_ORDER:
+        return False
+
+    e = int.from_bytes(tagged_hash("BIP0340/challenge", sig[:32] + pubkey + message), 'big') % CURVE_ORDER
+    # R = s*G - e*P
+    result = GENERATOR.mul_add(s, point, CURVE_ORDER - e)
+    if result == INFINITY:
+        return False
+    return result.y() % 2 == 0 and result.x() == r
+
+
+def verify_taproot_commitment(output_key, control_block, tapscript):
+    """ Check that a script path spend commits to the output key, returning the tapleaf hash """
+    leaf_version = control_block[0] & 0xfe
+    internal_key = control_block[1:33]
+    leaf_script = bytes([leaf_version]) + varint_encode(len(tapscript)) + tapscript
+    leaf_hash = tagged_hash("TapLeaf", leaf_script)
+
+    # Walk the merkle path up to the script tree root
+    node = leaf_hash
+    for i in range(33, len(control_block), 32):
+        sibling = control_block[i:i + 32]
+        if node < sibling:
+            node = tagged_hash("TapBranch", node + sibling)
+        else:
+            node = tagged_hash("TapBranch", sibling + node)
+
+    point = lift_x(int.from_bytes(internal_key, 'big'))
+    if point is None:
+        return None
+    tweak = int.from_bytes(tagged_hash("TapTweak", internal_key + node), 'big')
+    if tweak >= CURVE_ORDER:
+        return None
+
+    tweaked = GENERATOR.mul_add(tweak, point, 1)
+    if tweaked == INFINITY:
+        return None
+    if tweaked.x() != int.from_bytes(output_key, 'big') or tweaked.y() % 2 != control_block[0] & 1:
+        return None
+    return leaf_hash
+
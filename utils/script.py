@@ -0,0 +1,730 @@
+import hashlib
+
+from ecdsa import BadSignatureError, SECP256k1, VerifyingKey
+from ecdsa.errors import MalformedPointError
+from ecdsa.util import sigdecode_der
+
+from .schnorr import schnorr_verify, verify_taproot_commitment
+from .sighash import hash256, legacy_sighash, taproot_sighash, witness_v0_sighash
+
+# Opcodes used by the redeem, witness and tap scripts found in the mempool
+OP_0 = 0x00
+OP_PUSHDATA1 = 0x4c
+OP_PUSHDATA2 = 0x4d
+OP_PUSHDATA4 = 0x4e
+OP_1NEGATE = 0x4f
+OP_1 = 0x51
+OP_16 = 0x60
+OP_NOP = 0x61
+OP_IF = 0x63
+OP_NOTIF = 0x64
+OP_ELSE = 0x67
+OP_ENDIF = 0x68
+OP_VERIFY = 0x69
+OP_RETURN = 0x6a
+OP_TOALTSTACK = 0x6b
+OP_FROMALTSTACK = 0x6c
+OP_2DROP = 0x6d
+OP_2DUP = 0x6e
+OP_IFDUP = 0x73
+OP_DEPTH = 0x74
+OP_DROP = 0x75
+OP_DUP = 0x76
+OP_NIP = 0x77
+OP_OVER = 0x78
+OP_ROT = 0x7b
+OP_SWAP = 0x7c
+OP_TUCK = 0x7d
+OP_SIZE = 0x82
+OP_EQUAL = 0x87
+OP_EQUALVERIFY = 0x88
+OP_1ADD = 0x8b
+OP_1SUB = 0x8c
+OP_NOT = 0x91
+OP_0NOTEQUAL = 0x92
+OP_ADD = 0x93
+OP_SUB = 0x94
+OP_BOOLAND = 0x9a
+OP_BOOLOR = 0x9b
+OP_NUMEQUAL = 0x9c
+OP_NUMEQUALVERIFY = 0x9d
+OP_LESSTHAN = 0x9f
+OP_GREATERTHAN = 0xa0
+OP_MIN = 0xa3
+OP_MAX = 0xa4
+OP_WITHIN = 0xa5
+OP_RIPEMD160 = 0xa6
+OP_SHA256 = 0xa8
+OP_HASH160 = 0xa9
+OP_HASH256 = 0xaa
+OP_CHECKSIG = 0xac
+OP_CHECKSIGVERIFY = 0xad
+OP_CHECKMULTISIG = 0xae
+OP_CHECKMULTISIGVERIFY = 0xaf
+OP_CHECKLOCKTIMEVERIFY = 0xb1
+OP_CHECKSEQUENCEVERIFY = 0xb2
+OP_CHECKSIGADD = 0xba
+
+MAX_SCRIPT_SIZE = 10000
+MAX_STACK_SIZE = 1000
+MAX_PUBKEYS_PER_MULTISIG = 20
+MAX_COMPILED_SCRIPTS = 16384
+
+# Lock time and relative lock time (BIP65, BIP68, BIP112) constants
+LOCKTIME_THRESHOLD = 500000000
+SEQUENCE_FINAL = 0xffffffff
+SEQUENCE_LOCKTIME_DISABLE_FLAG = 1 << 31
+SEQUENCE_LOCKTIME_TYPE_FLAG = 1 << 22
+SEQUENCE_LOCKTIME_MASK = 0x0000ffff
+
+# Script execution contexts (which signature rules apply)
+SIGVERSION_BASE = 0
+SIGVERSION_WITNESS_V0 = 1
+SIGVERSION_TAPSCRIPT = 2
+
+SIGHASH_TYPES = (0x01, 0x02, 0x03, 0x81, 0x82, 0x83)
+
+# BIP342 OP_SUCCESSx: any of these in a tapscript makes it succeed unconditionally
+OP_SUCCESS_OPCODES = frozenset(
+    [0x50, 0x62, 0x7e, 0x7f, 0x80, 0x81, 0x83, 0x84, 0x85, 0x86, 0x89, 0x8a, 0x8d, 0x8e,
+     0x95, 0x96, 0x97, 0x98, 0x99] + list(range(0xbb, 0xff))
+)
+
+# Compiled redeem, witness and tap scripts keyed by the hash verification
+# already computes for them (sha256, or the tapleaf hash for tapscripts),
+# kept in least recently used order
+_compiled_scripts = {}
+
+
+class ScriptError(Exception):
+    pass
+
+
+def sha256(data):
+    return hashlib.sha256(data).digest()
+
+
+def hash160(data):
+    return hashlib.new('ripemd160', hashlib.sha256(data).digest()).digest()
+
+
+def parse_script(script):
+    """ Split raw script bytes into a tuple of (opcode, push data) pairs """
+    return tuple(iter_script(script))
+
+
+def iter_script(script):
+    i = 0
+    end = len(script)
+    while i < end:
+        opcode = script[i]
+        i += 1
+        if opcode > OP_PUSHDATA4:
+            yield opcode, None
+            continue
+
+        # Push operations: work out how many bytes follow
+        if opcode < OP_PUSHDATA1:
+            size = opcode
+        elif opcode == OP_PUSHDATA1:
+            size = int.from_bytes(script[i:i + 1], 'little')
+            i += 1
+        elif opcode == OP_PUSHDATA2:
+            size = int.from_bytes(script[i:i + 2], 'little')
+            i += 2
+        else:
+            size = int.from_bytes(script[i:i + 4], 'little')
+            i += 4
+
+        if i + size > end:
+            raise ScriptError("push past end of script")
+        yield opcode, script[i:i + size]
+        i += size
+
+
+def compile_script(script, script_hash=None, max_size=MAX_SCRIPT_SIZE):
+    """ Return the parsed op list for a redeem, witness or tap script, reusing earlier parses """
+    # The size limit applies on every call, cached or not
+    if max_size is not None and len(script) > max_size:
+        raise ScriptError("script too large")
+    if script_hash is None:
+        script_hash = sha256(script)
+
+    ops = _compiled_scripts.get(script_hash)
+    if ops is None:
+        ops = parse_script(script)
+        if len(_compiled_scripts) >= MAX_COMPILED_SCRIPTS:
+            # Evict the least recently used script
+            del _compiled_scripts[next(iter(_compiled_scripts))]
+    else:
+        # Move the hit to the most recently used end
+        del _compiled_scripts[script_hash]
+    _compiled_scripts[script_hash] = ops
+    return ops
+
+
+def push_only_data(ops):
+    # Data pushed by a scriptSig, which may only contain push operations
+    items = []
+    for opcode, data in ops:
+        if data is not None:
+            items.append(data)
+        elif opcode == OP_1NEGATE or OP_1 <= opcode <= OP_16:
+            items.append(encode_num(decode_small_int(opcode)))
+        else:
+            raise ScriptError("scriptsig is not push only")
+    return items
+
+
+def decode_small_int(opcode):
+    if opcode == OP_0:
+        return 0
+    if opcode == OP_1NEGATE:
+        return -1
+    return opcode - (OP_1 - 1)
+
+
+def encode_num(value):
+    if value == 0:
+        return b''
+    negative = value < 0
+    value = abs(value)
+    result = bytearray()
+    while value:
+        result.append(value & 0xff)
+        value >>= 8
+    # Sign bit lives in the most significant byte
+    if result[-1] & 0x80:
+        result.append(0x80 if negative else 0x00)
+    elif negative:
+        result[-1] |= 0x80
+    return bytes(result)
+
+
+def decode_num(data, max_size=4):
+    if len(data) > max_size:
+        raise ScriptError("script number overflow")
+    if not data:
+        return 0
+    value = int.from_bytes(data, 'little')
+    if data[-1] & 0x80:
+        return -(value & ~(0x80 << (8 * (len(data) - 1))))
+    return value
+
+
+def cast_to_bool(data):
+    for i, byte in enumerate(data):
+        if byte != 0:
+            # Negative zero is still false
+            return not (i == len(data) - 1 and byte == 0x80)
+    return False
+
+
+def is_valid_der_signature(sig):
+    """ Strict DER check (BIP66) on a signature that still carries its sighash byte """
+    if len(sig) < 9 or len(sig) > 73:
+        return False
+    if sig[0] != 0x30 or sig[1] != len(sig) - 3:
+        return False
+
+    len_r = sig[3]
+    if 5 + len_r >= len(sig):
+        return False
+    len_s = sig[5 + len_r]
+    if len_r + len_s + 7 != len(sig):
+        return False
+
+    # R and S must be positive integers without superfluous padding
+    if sig[2] != 0x02 or len_r == 0 or sig[4] & 0x80:
+        return False
+    if len_r > 1 and sig[4] == 0x00 and not sig[5] & 0x80:
+        return False
+    if sig[len_r + 4] != 0x02 or len_s == 0 or sig[len_r + 6] & 0x80:
+        return False
+    if len_s > 1 and sig[len_r + 6] == 0x00 and not sig[len_r + 7] & 0x80:
+        return False
+
+    return sig[-1] in SIGHASH_TYPES
+
+
+def is_valid_pubkey(pubkey):
+    if len(pubkey) == 33:
+        return pubkey[0] in (0x02, 0x03)
+    if len(pubkey) == 65:
+        return pubkey[0] == 0x04
+    return False
+
+
+def is_valid_schnorr_signature(sig):
+    if len(sig) == 64:
+        return True
+    return len(sig) == 65 and sig[-1] in SIGHASH_TYPES
+
+
+class SignatureChecker:
+    """ Verifies signatures and lock times for one input against the transaction spending it """
+
+    def __init__(self, tx_hashes, index, sigversion, script_code=b'', leaf_hash=None, annex=None):
+        self.tx_hashes = tx_hashes
+        self.index = index
+        self.sigversion = sigversion
+        self.script_code = script_code
+        self.leaf_hash = leaf_hash
+        self.annex = annex
+        self.version = int.from_bytes(tx_hashes.version, 'little')
+        self.locktime = int.from_bytes(tx_hashes.locktime, 'little')
+        self.sequence = int.from_bytes(tx_hashes.sequences[index], 'little')
+
+    def check_locktime(self, locktime):
+        """ BIP65: the transaction's nLockTime must have reached the script's lock time """
+        # Both must be block heights or both timestamps
+        if (self.locktime < LOCKTIME_THRESHOLD) != (locktime < LOCKTIME_THRESHOLD):
+            return False
+        if locktime > self.locktime:
+            return False
+        # A final sequence would disable nLockTime altogether
+        return self.sequence != SEQUENCE_FINAL
+
+    def check_sequence(self, sequence):
+        """ BIP112: the input's nSequence must encode at least the script's relative lock time """
+        if self.version < 2:
+            return False
+        if self.sequence & SEQUENCE_LOCKTIME_DISABLE_FLAG:
+            return False
+
+        mask = SEQUENCE_LOCKTIME_TYPE_FLAG | SEQUENCE_LOCKTIME_MASK
+        tx_sequence = self.sequence & mask
+        sequence &= mask
+        # Both must be block counts or both time intervals
+        if (tx_sequence < SEQUENCE_LOCKTIME_TYPE_FLAG) != (sequence < SEQUENCE_LOCKTIME_TYPE_FLAG):
+            return False
+        return sequence <= tx_sequence
+
+    def check_signature(self, sig, pubkey):
+        if self.sigversion == SIGVERSION_TAPSCRIPT:
+            return self.check_schnorr(sig, pubkey)
+        return self.check_ecdsa(sig, pubkey)
+
+    def check_ecdsa(self, sig, pubkey):
+        if not is_valid_pubkey(pubkey) or not is_valid_der_signature(sig):
+            return False
+        hash_type = sig[-1]
+        if self.sigversion == SIGVERSION_WITNESS_V0:
+            # Segwit v0 only allows compressed keys
+            if len(pubkey) != 33:
+                return False
+            digest = witness_v0_sighash(self.tx_hashes, self.index, self.script_code, hash_type)
+        else:
+            # The signature cannot sign itself, so it is removed from the script code
+            script_code = self.script_code
+            if len(sig) < OP_PUSHDATA1:
+                script_code = script_code.replace(bytes([len(sig)]) + sig, b'')
+            digest = legacy_sighash(self.tx_hashes, self.index, script_code, hash_type)
+
+        try:
+            key = VerifyingKey.from_string(pubkey, curve=SECP256k1)
+            return key.verify_digest(sig[:-1], digest, sigdecode=sigdecode_der)
+        except (BadSignatureError, MalformedPointError, ValueError):
+            return False
+
+    def check_schnorr(self, sig, pubkey):
+        if len(pubkey) != 32 or not is_valid_schnorr_signature(sig):
+            return False
+        hash_type = sig[64] if len(sig) == 65 else 0
+        if len(sig) == 65 and hash_type == 0:
+            return False
+        message = taproot_sighash(self.tx_hashes, self.index, hash_type, self.annex, self.leaf_hash)
+        if message is None:
+            return False
+        return schnorr_verify(pubkey, message, sig[:64])
+
+    def check_tapscript_signature(self, sig, pubkey):
+        # BIP342: empty keys fail, unknown key types are left for future upgrades
+        if not pubkey:
+            raise ScriptError("empty tapscript public key")
+        if not sig:
+            return False
+        valid = self.check_schnorr(sig, pubkey) if len(pubkey) == 32 else True
+        if not valid:
+            raise ScriptError("invalid tapscript signature")
+        return True
+
+
+def execute_script(ops, stack, checker):
+    """ Run a compiled script against the given stack, raising ScriptError on failure """
+    sigversion = checker.sigversion
+    altstack = []
+    exec_stack = []
+
+    def pop():
+        if not stack:
+            raise ScriptError("stack underflow")
+        return stack.pop()
+
+    def pop_num():
+        return decode_num(pop())
+
+    def need(count):
+        if len(stack) < count:
+            raise ScriptError("stack underflow")
+
+    for opcode, data in ops:
+        executing = all(exec_stack)
+
+        # Flow control is tracked even inside unexecuted branches
+        if opcode in (OP_IF, OP_NOTIF):
+            value = False
+            if executing:
+                top = pop()
+                if sigversion == SIGVERSION_TAPSCRIPT and top not in (b'', b'\x01'):
+                    raise ScriptError("tapscript requires minimal if")
+                value = cast_to_bool(top)
+                if opcode == OP_NOTIF:
+                    value = not value
+            exec_stack.append(value)
+            continue
+        if opcode == OP_ELSE:
+            if not exec_stack:
+                raise ScriptError("unbalanced conditional")
+            exec_stack[-1] = not exec_stack[-1]
+            continue
+        if opcode == OP_ENDIF:
+            if not exec_stack:
+                raise ScriptError("unbalanced conditional")
+            exec_stack.pop()
+            continue
+
+        if not executing:
+            continue
+
+        if data is not None:
+            stack.append(data)
+        elif opcode == OP_0:
+            stack.append(b'')
+        elif opcode == OP_1NEGATE or OP_1 <= opcode <= OP_16:
+            stack.append(encode_num(decode_small_int(opcode)))
+        elif opcode == OP_NOP:
+            pass
+        elif opcode == OP_VERIFY:
+            if not cast_to_bool(pop()):
+                raise ScriptError("OP_VERIFY failed")
+        elif opcode == OP_RETURN:
+            raise ScriptError("OP_RETURN encountered")
+        elif opcode == OP_TOALTSTACK:
+            altstack.append(pop())
+        elif opcode == OP_FROMALTSTACK:
+            if not altstack:
+                raise ScriptError("altstack underflow")
+            stack.append(altstack.pop())
+        elif opcode == OP_2DROP:
+            need(2)
+            del stack[-2:]
+        elif opcode == OP_2DUP:
+            need(2)
+            stack.extend(stack[-2:])
+        elif opcode == OP_IFDUP:
+            need(1)
+            if cast_to_bool(stack[-1]):
+                stack.append(stack[-1])
+        elif opcode == OP_DEPTH:
+            stack.append(encode_num(len(stack)))
+        elif opcode == OP_DROP:
+            pop()
+        elif opcode == OP_DUP:
+            need(1)
+            stack.append(stack[-1])
+        elif opcode == OP_NIP:
+            need(2)
+            del stack[-2]
+        elif opcode == OP_OVER:
+            need(2)
+            stack.append(stack[-2])
+        elif opcode == OP_ROT:
+            need(3)
+            stack.append(stack.pop(-3))
+        elif opcode == OP_SWAP:
+            need(2)
+            stack[-1], stack[-2] = stack[-2], stack[-1]
+        elif opcode == OP_TUCK:
+            need(2)
+            stack.insert(-2, stack[-1])
+        elif opcode == OP_SIZE:
+            need(1)
+            stack.append(encode_num(len(stack[-1])))
+        elif opcode in (OP_EQUAL, OP_EQUALVERIFY):
+            equal = pop() == pop()
+            if opcode == OP_EQUALVERIFY:
+                if not equal:
+                    raise ScriptError("OP_EQUALVERIFY failed")
+            else:
+                stack.append(b'\x01' if equal else b'')
+        elif opcode in (OP_1ADD, OP_1SUB, OP_NOT, OP_0NOTEQUAL):
+            value = pop_num()
+            if opcode == OP_1ADD:
+                value += 1
+            elif opcode == OP_1SUB:
+                value -= 1
+            elif opcode == OP_NOT:
+                value = int(value == 0)
+            else:
+                value = int(value != 0)
+            stack.append(encode_num(value))
+        elif opcode in (OP_ADD, OP_SUB, OP_BOOLAND, OP_BOOLOR, OP_NUMEQUAL,
+                        OP_NUMEQUALVERIFY, OP_LESSTHAN, OP_GREATERTHAN, OP_MIN, OP_MAX):
+            b = pop_num()
+            a = pop_num()
+            if opcode == OP_ADD:
+                value = a + b
+            elif opcode == OP_SUB:
+                value = a - b
+            elif opcode == OP_BOOLAND:
+                value = int(a != 0 and b != 0)
+            elif opcode == OP_BOOLOR:
+                value = int(a != 0 or b != 0)
+            elif opcode in (OP_NUMEQUAL, OP_NUMEQUALVERIFY):
+                value = int(a == b)
+            elif opcode == OP_LESSTHAN:
+                value = int(a < b)
+            elif opcode == OP_GREATERTHAN:
+                value = int(a > b)
+            elif opcode == OP_MIN:
+                value = min(a, b)
+            else:
+                value = max(a, b)
+            if opcode == OP_NUMEQUALVERIFY:
+                if not value:
+                    raise ScriptError("OP_NUMEQUALVERIFY failed")
+            else:
+                stack.append(encode_num(value))
+        elif opcode == OP_WITHIN:
+            upper = pop_num()
+            lower = pop_num()
+            value = pop_num()
+            stack.append(b'\x01' if lower <= value < upper else b'')
+        elif opcode == OP_RIPEMD160:
+            stack.append(hashlib.new('ripemd160', pop()).digest())
+        elif opcode == OP_SHA256:
+            stack.append(sha256(pop()))
+        elif opcode == OP_HASH160:
+            stack.append(hash160(pop()))
+        elif opcode == OP_HASH256:
+            stack.append(hash256(pop()))
+        elif opcode in (OP_CHECKSIG, OP_CHECKSIGVERIFY):
+            pubkey = pop()
+            sig = pop()
+            if sigversion == SIGVERSION_TAPSCRIPT:
+                valid = checker.check_tapscript_signature(sig, pubkey)
+            else:
+                valid = bool(sig) and checker.check_signature(sig, pubkey)
+            if opcode == OP_CHECKSIGVERIFY:
+                if not valid:
+                    raise ScriptError("OP_CHECKSIGVERIFY failed")
+            else:
+                stack.append(b'\x01' if valid else b'')
+        elif opcode == OP_CHECKSIGADD:
+            if sigversion != SIGVERSION_TAPSCRIPT:
+                raise ScriptError("OP_CHECKSIGADD outside tapscript")
+            pubkey = pop()
+            count = pop_num()
+            sig = pop()
+            valid = checker.check_tapscript_signature(sig, pubkey)
+            stack.append(encode_num(count + 1 if valid else count))
+        elif opcode in (OP_CHECKMULTISIG, OP_CHECKMULTISIGVERIFY):
+            if sigversion == SIGVERSION_TAPSCRIPT:
+                raise ScriptError("OP_CHECKMULTISIG disabled in tapscript")
+            valid = check_multisig(pop, pop_num, checker)
+            if opcode == OP_CHECKMULTISIGVERIFY:
+                if not valid:
+                    raise ScriptError("OP_CHECKMULTISIGVERIFY failed")
+            else:
+                stack.append(b'\x01' if valid else b'')
+        elif opcode == OP_CHECKLOCKTIMEVERIFY:
+            need(1)
+            locktime = decode_num(stack[-1], max_size=5)
+            if locktime < 0:
+                raise ScriptError("negative locktime")
+            if not checker.check_locktime(locktime):
+                raise ScriptError("unsatisfied locktime")
+        elif opcode == OP_CHECKSEQUENCEVERIFY:
+            need(1)
+            sequence = decode_num(stack[-1], max_size=5)
+            if sequence < 0:
+                raise ScriptError("negative locktime")
+            # With the disable flag set the opcode behaves as a NOP
+            if not sequence & SEQUENCE_LOCKTIME_DISABLE_FLAG and not checker.check_sequence(sequence):
+                raise ScriptError("unsatisfied locktime")
+        else:
+            raise ScriptError(f"unsupported opcode 0x{opcode:02x}")
+
+        if len(stack) + len(altstack) > MAX_STACK_SIZE:
+            raise ScriptError("stack size limit exceeded")
+
+    if exec_stack:
+        raise ScriptError("unbalanced conditional")
+    return stack
+
+
+def check_multisig(pop, pop_num, checker):
+    key_count = pop_num()
+    if key_count < 0 or key_count > MAX_PUBKEYS_PER_MULTISIG:
+        raise ScriptError("invalid pubkey count")
+    pubkeys = [pop() for _ in range(key_count)]
+
+    sig_count = pop_num()
+    if sig_count < 0 or sig_count > key_count:
+        raise ScriptError("invalid signature count")
+    sigs = [pop() for _ in range(sig_count)]
+
+    # Extra element consumed by the historical off-by-one bug, must be empty
+    if pop() != b'':
+        raise ScriptError("multisig dummy element must be empty")
+
+    # Signatures have to appear in the same order as their public keys
+    key_index = 0
+    for sig in sigs:
+        while key_index < key_count:
+            key_index += 1
+            if checker.check_signature(sig, pubkeys[key_index - 1]):
+                break
+        else:
+            return False
+    return True
+
+
+def eval_to_true(ops, stack, checker):
+    try:
+        stack = execute_script(ops, stack, checker)
+    except ScriptError:
+        return False
+    return bool(stack) and cast_to_bool(stack[-1])
+
+
+def verify_witness_program(version, program, witness, tx_hashes, index):
+    if version == 0 and len(program) == 20:
+        # P2WPKH: witness is <sig> <pubkey>, signed with the matching P2PKH script
+        if len(witness) != 2 or hash160(witness[1]) != program:
+            return False
+        script_code = bytes([OP_DUP, OP_HASH160, 20]) + program + bytes([OP_EQUALVERIFY, OP_CHECKSIG])
+        checker = SignatureChecker(tx_hashes, index, SIGVERSION_WITNESS_V0, script_code)
+        return checker.check_signature(witness[0], witness[1])
+
+    if version == 0 and len(program) == 32:
+        # P2WSH: last witness item is the witness script
+        if not witness:
+            return False
+        witness_script = witness[-1]
+        if sha256(witness_script) != program:
+            return False
+        ops = compile_script(witness_script, program)
+        checker = SignatureChecker(tx_hashes, index, SIGVERSION_WITNESS_V0, witness_script)
+        stack = execute_witness(ops, witness[:-1], checker)
+        return stack is not None and len(stack) == 1
+
+    if version == 1 and len(program) == 32:
+        return verify_taproot(program, witness, tx_hashes, index)
+
+    # Unknown witness versions are anyone-can-spend
+    return version != 0
+
+
+def verify_taproot(output_key, witness, tx_hashes, index):
+    # Split off the annex if present
+    annex = None
+    if len(witness) >= 2 and witness[-1][:1] == b'\x50':
+        annex = witness[-1]
+        witness = witness[:-1]
+    if len(witness) == 1:
+        # Key path spend, signed by the output key itself
+        checker = SignatureChecker(tx_hashes, index, SIGVERSION_TAPSCRIPT, annex=annex)
+        return checker.check_schnorr(witness[0], output_key)
+    if not witness:
+        return False
+
+    control_block = witness[-1]
+    tapscript = witness[-2]
+    if len(control_block) < 33 or (len(control_block) - 33) % 32 != 0:
+        return False
+    leaf_hash = verify_taproot_commitment(output_key, control_block, tapscript)
+    if leaf_hash is None:
+        return False
+    if control_block[0] & 0xfe != 0xc0:
+        # Unknown leaf versions are anyone-can-spend
+        return True
+
+    # Tapscript drops the script size limit
+    try:
+        ops = compile_script(tapscript, leaf_hash, max_size=None)
+    except ScriptError:
+        # An OP_SUCCESSx decoded before the bad push still makes the spend valid
+        return has_op_success(iter_script(tapscript))
+    if has_op_success(ops):
+        return True
+    checker = SignatureChecker(tx_hashes, index, SIGVERSION_TAPSCRIPT, leaf_hash=leaf_hash, annex=annex)
+    stack = execute_witness(ops, witness[:-2], checker)
+    return stack is not None and len(stack) == 1
+
+
+def has_op_success(ops):
+    """ Scan tapscript ops for OP_SUCCESSx, stopping at the first undecodable push """
+    try:
+        return any(opcode in OP_SUCCESS_OPCODES for opcode, _ in ops)
+    except ScriptError:
+        return False
+
+
+def execute_witness(ops, items, checker):
+    stack = list(items)
+    if not eval_to_true(ops, stack, checker):
+        return None
+    return stack
+
+
+def verify_script_input(input, index, tx_hashes):
+    """ Execute the scripts guarding a p2sh, p2wsh or p2tr input, verifying its signatures """
+    try:
+        prevout = input.get('prevout', {})
+        scriptpubkey = bytes.fromhex(prevout.get('scriptpubkey', ''))
+        scriptsig = bytes.fromhex(input.get('scriptsig', ''))
+        witness = [bytes.fromhex(item) for item in input.get('witness', [])]
+        scriptpubkey_type = prevout.get('scriptpubkey_type', '')
+
+        if scriptpubkey_type == 'p2sh':
+            return verify_p2sh(scriptpubkey, scriptsig, witness, tx_hashes, index)
+
+        # Native segwit spends must leave the scriptSig empty
+        if scriptsig:
+            return False
+        version_op = scriptpubkey[0]
+        version = 0 if version_op == OP_0 else version_op - (OP_1 - 1)
+        return verify_witness_program(version, scriptpubkey[2:], witness, tx_hashes, index)
+
+    except (ScriptError, ValueError, IndexError):
+        return False
+
+
+def verify_p2sh(scriptpubkey, scriptsig, witness, tx_hashes, index):
+    # ScriptSigs carry signatures and are effectively unique, so they skip the cache
+    if len(scriptsig) > MAX_SCRIPT_SIZE:
+        raise ScriptError("script too large")
+    items = push_only_data(parse_script(scriptsig))
+    if not items:
+        return False
+    redeem_script = items[-1]
+    redeem_hash = sha256(redeem_script)
+    if hashlib.new('ripemd160', redeem_hash).digest() != scriptpubkey[2:22]:
+        return False
+
+    # Nested segwit: redeem script is a bare witness program
+    if 4 <= len(redeem_script) <= 42 and redeem_script[1] == len(redeem_script) - 2:
+        version_op = redeem_script[0]
+        if version_op == OP_0 or OP_1 <= version_op <= OP_16:
+            version = 0 if version_op == OP_0 else version_op - (OP_1 - 1)
+            if len(items) != 1:
+                return False
+            return verify_witness_program(version, redeem_script[2:], witness, tx_hashes, index)
+
+    if witness:
+        return False
+    ops = compile_script(redeem_script, redeem_hash)
+    checker = SignatureChecker(tx_hashes, index, SIGVERSION_BASE, redeem_script)
+    return eval_to_true(ops, items[:-1], checker)
@@ -70,6 +70,8 @@ def serialize_transaction(transactions):
 
 def wit_serialize_transaction(transactions):
   wtxid_array = ['0000000000000000000000000000000000000000000000000000000000000000']
+  # Serialized bytes of every transaction, kept for writing the raw block
+  tx_buffers = []
   for transaction in transactions:
     version = transaction['version']
     locktime = transaction['locktime']
@@ -125,6 +127,9 @@ def wit_serialize_transaction(transactions):
                 for witness_item in input['witness']:
                     tx_data += varint_encode(len(bytes.fromhex(witness_item)))  # Length of witness item
                     tx_data += bytes.fromhex(witness_item)
+            else:
+                # Inputs without a witness still need an empty witness stack
+                tx_data += varint_encode(0)
 
 
     # Calculate wtxid (hash of tx_data with marker and flag)
@@ -132,5 +137,6 @@ def wit_serialize_transaction(transactions):
     wtxid_hash = hashlib.sha256(hashlib.sha256(tx_data).digest()).digest()
 
     wtxid_array.append(wtxid_hash[::-1].hex())
+    tx_buffers.append(tx_data)
 
-  return wtxid_array, tx_data.hex(), wtxid_hash.hex(), wtxid_hash[::-1].hex()
\ No newline at end of file
+  return wtxid_array, tx_data.hex(), wtxid_hash.hex(), wtxid_hash[::-1].hex(), tx_buffers
\ No newline at end of file
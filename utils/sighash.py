@@ -0,0 +1,199 @@
+import hashlib
+from functools import cached_property
+
+from .serialize import little_endian_bytes, varint_encode
+
+SIGHASH_DEFAULT = 0x00
+SIGHASH_ALL = 0x01
+SIGHASH_NONE = 0x02
+SIGHASH_SINGLE = 0x03
+SIGHASH_ANYONECANPAY = 0x80
+
+
+def hash256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def tagged_hash(tag, data):
+    tag_hash = hashlib.sha256(tag.encode()).digest()
+    return hashlib.sha256(tag_hash + tag_hash + data).digest()
+
+
+def serialize_output(value, script_pubkey):
+    return little_endian_bytes(value, 8) + varint_encode(len(script_pubkey)) + script_pubkey
+
+
+class TransactionHashes:
+    """
+    Decoded transaction fields plus the per-transaction hashes shared by
+    every input's BIP143 and BIP341 signature message.
+    """
+
+    def __init__(self, transaction):
+        self.version = little_endian_bytes(transaction['version'], 4)
+        self.locktime = little_endian_bytes(transaction['locktime'], 4)
+
+        self.outpoints = []
+        self.sequences = []
+        self.amounts = []
+        self.script_pubkeys = []
+        for input in transaction['vin']:
+            prevout = input.get('prevout', {})
+            self.outpoints.append(bytes.fromhex(input['txid'])[::-1] + little_endian_bytes(input['vout'], 4))
+            self.sequences.append(little_endian_bytes(input['sequence'], 4))
+            self.amounts.append(little_endian_bytes(prevout.get('value', 0), 8))
+            self.script_pubkeys.append(bytes.fromhex(prevout.get('scriptpubkey', '')))
+
+        self.outputs = [serialize_output(output['value'], bytes.fromhex(output['scriptpubkey']))
+                        for output in transaction['vout']]
+
+    # BIP143 (segwit v0) hashes
+    @cached_property
+    def hash_prevouts(self):
+        return hash256(b''.join(self.outpoints))
+
+    @cached_property
+    def hash_sequence(self):
+        return hash256(b''.join(self.sequences))
+
+    @cached_property
+    def hash_outputs(self):
+        return hash256(b''.join(self.outputs))
+
+    # BIP341 (taproot) hashes
+    @cached_property
+    def sha_prevouts(self):
+        return hashlib.sha256(b''.join(self.outpoints)).digest()
+
+    @cached_property
+    def sha_amounts(self):
+        return hashlib.sha256(b''.join(self.amounts)).digest()
+
+    @cached_property
+    def sha_scriptpubkeys(self):
+        return hashlib.sha256(b''.join(varint_encode(len(spk)) + spk for spk in self.script_pubkeys)).digest()
+
+    @cached_property
+    def sha_sequences(self):
+        return hashlib.sha256(b''.join(self.sequences)).digest()
+
+    @cached_property
+    def sha_outputs(self):
+        return hashlib.sha256(b''.join(self.outputs)).digest()
+
+
+def legacy_sighash(tx_hashes, index, script_code, hash_type):
+    """ Signature hash for pre-segwit scripts """
+    base_type = hash_type & 0x1f
+    anyone_can_pay = hash_type & SIGHASH_ANYONECANPAY
+
+    if base_type == SIGHASH_SINGLE and index >= len(tx_hashes.outputs):
+        # Historical bug: signs the number one instead of failing
+        return (1).to_bytes(32, 'little')
+
+    if anyone_can_pay:
+        input_indexes = [index]
+    else:
+        input_indexes = range(len(tx_hashes.outpoints))
+
+    tx_data = tx_hashes.version + varint_encode(len(input_indexes))
+    for i in input_indexes:
+        script = script_code if i == index else b''
+        sequence = tx_hashes.sequences[i]
+        if i != index and base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+            sequence = bytes(4)
+        tx_data += tx_hashes.outpoints[i] + varint_encode(len(script)) + script + sequence
+
+    if base_type == SIGHASH_NONE:
+        outputs = []
+    elif base_type == SIGHASH_SINGLE:
+        # Earlier outputs are blanked to value -1 with an empty script
+        outputs = [serialize_output(0xffffffffffffffff, b'')] * index + [tx_hashes.outputs[index]]
+    else:
+        outputs = tx_hashes.outputs
+    tx_data += varint_encode(len(outputs)) + b''.join(outputs)
+
+    tx_data += tx_hashes.locktime + little_endian_bytes(hash_type, 4)
+    return hash256(tx_data)
+
+
+def witness_v0_sighash(tx_hashes, index, script_code, hash_type):
+    """ Signature hash for segwit v0 scripts (BIP143) """
+    base_type = hash_type & 0x1f
+    anyone_can_pay = hash_type & SIGHASH_ANYONECANPAY
+    zero_hash = bytes(32)
+
+    hash_prevouts = zero_hash if anyone_can_pay else tx_hashes.hash_prevouts
+    if anyone_can_pay or base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+        hash_sequence = zero_hash
+    else:
+        hash_sequence = tx_hashes.hash_sequence
+
+    if base_type not in (SIGHASH_NONE, SIGHASH_SINGLE):
+        hash_outputs = tx_hashes.hash_outputs
+    elif base_type == SIGHASH_SINGLE and index < len(tx_hashes.outputs):
+        hash_outputs = hash256(tx_hashes.outputs[index])
+    else:
+        hash_outputs = zero_hash
+
+    preimage = (
+        tx_hashes.version +
+        hash_prevouts +
+        hash_sequence +
+        tx_hashes.outpoints[index] +
+        varint_encode(len(script_code)) +
+        script_code +
+        tx_hashes.amounts[index] +
+        tx_hashes.sequences[index] +
+        hash_outputs +
+        tx_hashes.locktime +
+        little_endian_bytes(hash_type, 4)
+    )
+    return hash256(preimage)
+
+
+def taproot_sighash(tx_hashes, index, hash_type, annex=None, leaf_hash=None):
+    """ Signature hash for taproot key and script path spends (BIP341), or None if hash_type is invalid """
+    if hash_type not in (0x00, 0x01, 0x02, 0x03, 0x81, 0x82, 0x83):
+        return None
+    base_type = hash_type & 0x03
+    anyone_can_pay = hash_type & SIGHASH_ANYONECANPAY
+
+    message = b'\x00' + bytes([hash_type]) + tx_hashes.version + tx_hashes.locktime
+    if not anyone_can_pay:
+        message += (
+            tx_hashes.sha_prevouts +
+            tx_hashes.sha_amounts +
+            tx_hashes.sha_scriptpubkeys +
+            tx_hashes.sha_sequences
+        )
+    if base_type not in (SIGHASH_NONE, SIGHASH_SINGLE):
+        message += tx_hashes.sha_outputs
+
+    ext_flag = 0 if leaf_hash is None else 1
+    message += bytes([ext_flag * 2 + (annex is not None)])
+
+    if anyone_can_pay:
+        script_pubkey = tx_hashes.script_pubkeys[index]
+        message += (
+            tx_hashes.outpoints[index] +
+            tx_hashes.amounts[index] +
+            varint_encode(len(script_pubkey)) + script_pubkey +
+            tx_hashes.sequences[index]
+        )
+    else:
+        message += little_endian_bytes(index, 4)
+
+    if annex is not None:
+        message += hashlib.sha256(varint_encode(len(annex)) + annex).digest()
+
+    if base_type == SIGHASH_SINGLE:
+        if index >= len(tx_hashes.outputs):
+            return None
+        message += hashlib.sha256(tx_hashes.outputs[index]).digest()
+
+    if leaf_hash is not None:
+        # Key version 0 and no OP_CODESEPARATOR executed
+        message += leaf_hash + b'\x00' + b'\xff\xff\xff\xff'
+
+    return tagged_hash("TapSighash", message)